@@ -0,0 +1,158 @@
+# pragma pylint: disable=missing-docstring, protected-access, C0103
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from freqtrade.data.dataprovider import DataProvider
+from freqtrade.resolvers import StrategyResolver
+
+
+def reference_entry_signals(pair_data: dict, pair: str, lookback: int, top_n: int) -> tuple:
+    """
+    Per-candle ranking loop of the original MomentumRankStrategy.populate_entry_trend.
+    Unlike the original, pairs with non-finite momentum (NaN closes) are excluded from
+    the ranking - this is the intended behaviour of the vectorised strategy.
+    """
+    length = len(pair_data[pair])
+    enter_long = np.zeros(length, dtype=int)
+    enter_short = np.zeros(length, dtype=int)
+    for i in range(lookback, length):
+        all_pairs_momentum = {}
+        for p, df in pair_data.items():
+            if len(df) > i:
+                prev = df["close"].iloc[i - lookback]
+                momentum = (df["close"].iloc[i] - prev) / prev * 100
+                if np.isfinite(momentum):
+                    all_pairs_momentum[p] = momentum
+        if all_pairs_momentum:
+            sorted_pairs = sorted(all_pairs_momentum.items(), key=lambda x: x[1], reverse=True)
+            if pair in [p[0] for p in sorted_pairs[:top_n]]:
+                enter_long[i] = 1
+            if pair in [p[0] for p in sorted_pairs[-top_n:]]:
+                enter_short[i] = 1
+    return enter_long, enter_short
+
+
+def make_pair_data(closes: dict) -> dict:
+    return {
+        pair: pd.DataFrame(
+            {
+                "date": pd.date_range("2024-01-01", periods=len(close), freq="30min", tz="UTC"),
+                "close": close,
+            }
+        )
+        for pair, close in closes.items()
+    }
+
+
+@pytest.fixture
+def momentum_strategy(default_conf_usdt):
+    default_conf_usdt.update(
+        {
+            "strategy": "MomentumRankStrategy",
+            "strategy_path": str(Path(__file__).parents[2] / "user_data/strategies"),
+            "trading_mode": "futures",
+            "margin_mode": "isolated",
+        }
+    )
+    del default_conf_usdt["timeframe"]
+    strategy = StrategyResolver.load_strategy(default_conf_usdt)
+    strategy.dp = DataProvider(default_conf_usdt, None, None)
+    strategy.wallets = MagicMock()
+    strategy.wallets.get_total_stake_amount = MagicMock(return_value=1000)
+    return strategy
+
+
+def run_strategy(mocker, strategy, pair_data: dict, missing: tuple = ()) -> dict:
+    """Analyze all pairs; pairs in `missing` are whitelisted but return an empty DataFrame"""
+    mocker.patch.object(
+        strategy.dp, "current_whitelist", return_value=list(pair_data) + list(missing)
+    )
+    mocker.patch.object(
+        strategy.dp,
+        "get_pair_dataframe",
+        side_effect=lambda p, tf: pair_data[p].copy() if p in pair_data else pd.DataFrame(),
+    )
+    result = {}
+    for pair, df in pair_data.items():
+        df = strategy.advise_indicators(df.copy(), {"pair": pair})
+        df = strategy.populate_entry_trend(df, {"pair": pair})
+        result[pair] = strategy.populate_exit_trend(df, {"pair": pair})
+    return result
+
+
+def assert_matches_reference(strategy, pair_data: dict, result: dict) -> None:
+    holding = strategy.HOLDING_PERIOD * 24 * 60 // int(strategy.timeframe[:-1])
+    for pair, df in result.items():
+        enter_long, enter_short = reference_entry_signals(
+            pair_data, pair, strategy.LOOKBACK_PERIOD, strategy.TOP_N
+        )
+        np.testing.assert_array_equal(df["enter_long"].to_numpy(), enter_long, err_msg=pair)
+        np.testing.assert_array_equal(df["enter_short"].to_numpy(), enter_short, err_msg=pair)
+        exit_long = np.r_[np.zeros(holding, dtype=int), enter_long][: len(df)]
+        exit_short = np.r_[np.zeros(holding, dtype=int), enter_short][: len(df)]
+        np.testing.assert_array_equal(df["exit_long"].to_numpy(), exit_long, err_msg=pair)
+        np.testing.assert_array_equal(df["exit_short"].to_numpy(), exit_short, err_msg=pair)
+
+
+def test_momentum_rank_ties(mocker, momentum_strategy):
+    lookback = momentum_strategy.LOOKBACK_PERIOD
+    length = 80
+    # Momentum of +5, 0, 0, 0, -5 on every candle after the lookback
+    closes = {
+        f"P{j}/USDT:USDT": 100 * (1 + step / 100) ** (np.arange(length) / lookback)
+        for j, step in enumerate([5, 0, 0, 0, -5])
+    }
+    pair_data = make_pair_data(closes)
+    result = run_strategy(mocker, momentum_strategy, pair_data)
+    assert_matches_reference(momentum_strategy, pair_data, result)
+
+    last = {p: (df["enter_long"].iat[-1], df["enter_short"].iat[-1]) for p, df in result.items()}
+    assert last["P0/USDT:USDT"] == (1, 0)
+    assert last["P1/USDT:USDT"] == (1, 0)
+    assert last["P2/USDT:USDT"] == (0, 0)
+    assert last["P3/USDT:USDT"] == (0, 1)
+    assert last["P4/USDT:USDT"] == (0, 1)
+
+
+def test_momentum_rank_all_tied_no_conflicts(mocker, momentum_strategy):
+    # Flat prices (e.g. gap-filled candles) - every pair has 0% momentum
+    pair_data = make_pair_data({f"P{j}/USDT:USDT": np.full(60, 10.0) for j in range(8)})
+    result = run_strategy(mocker, momentum_strategy, pair_data)
+    assert_matches_reference(momentum_strategy, pair_data, result)
+    for df in result.values():
+        assert not ((df["enter_long"] == 1) & (df["enter_short"] == 1)).any()
+
+
+def test_momentum_rank_uneven_lengths_and_nan(mocker, momentum_strategy):
+    rng = np.random.default_rng(42)
+    closes = {}
+    for j, length in enumerate([200, 200, 150, 200, 120, 200, 200]):
+        # Rounded prices produce frequent exact momentum ties
+        closes[f"P{j}/USDT:USDT"] = np.round(
+            100 * np.exp(np.cumsum(rng.normal(0, 0.01, length))), 0
+        )
+    closes["P1/USDT:USDT"][[30, 31, 90]] = np.nan
+    closes["P5/USDT:USDT"][:20] = np.nan
+    pair_data = make_pair_data(closes)
+    result = run_strategy(mocker, momentum_strategy, pair_data)
+    assert_matches_reference(momentum_strategy, pair_data, result)
+
+
+def test_momentum_rank_without_bot_start(mocker, momentum_strategy):
+    # Ranking cache must not depend on bot_start having been called
+    pair_data = make_pair_data({f"P{j}/USDT:USDT": np.full(30, 10.0 + j) for j in range(3)})
+    result = run_strategy(mocker, momentum_strategy, pair_data)
+    assert_matches_reference(momentum_strategy, pair_data, result)
+
+
+def test_momentum_rank_pair_without_data(mocker, momentum_strategy):
+    # A freshly added pair may not have candles yet - exchange returns DataFrame()
+    rng = np.random.default_rng(7)
+    closes = {f"P{j}/USDT:USDT": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 60))) for j in range(3)}
+    pair_data = make_pair_data(closes)
+    result = run_strategy(mocker, momentum_strategy, pair_data, missing=("NEW/USDT:USDT",))
+    assert_matches_reference(momentum_strategy, pair_data, result)
@@ -1,9 +1,14 @@
-from freqtrade.strategy import IStrategy
-from pandas import DataFrame
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
 
+import numpy as np
+from pandas import DataFrame
+
+from freqtrade.constants import Config
+from freqtrade.strategy import IStrategy
+
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,6 +51,13 @@ class MomentumRankStrategy(IStrategy):
     }
     can_short = True  # 允许做空
 
+    # 同一根K线上所有币对共享一次排名结果, 只保留最新一组
+    _mom_cache: dict
+
+    def __init__(self, config: Config) -> None:
+        super().__init__(config)
+        self._mom_cache = {}
+
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """计算动量指标"""
         # 计算涨跌幅
@@ -56,109 +68,136 @@ class MomentumRankStrategy(IStrategy):
         )
         return dataframe
 
+    def _rank_momentum(
+        self, pairs: list[str], min_width: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        一次性计算所有币对的动量矩阵及排名
+        :param pairs: 参与排名的币对
+        :param min_width: 矩阵最少的K线数量
+        :return: (收盘价, 动量, 做多掩码, 做空掩码), 形状均为 (币对数, K线数)
+        """
+        closes = []
+        for p in pairs:
+            # 新加入或拉取失败的币对可能返回无列的空DataFrame, 视为无数据
+            pair_dataframe = self.dp.get_pair_dataframe(p, self.timeframe)
+            if "close" in pair_dataframe:
+                closes.append(pair_dataframe["close"].to_numpy(dtype=float))
+            else:
+                closes.append(np.empty(0))
+        width = max([min_width] + [len(c) for c in closes])
+
+        # 按位置对齐, 数据不足的币对以NaN补齐
+        close = np.full((len(pairs), width), np.nan)
+        for row, c in zip(close, closes, strict=True):
+            row[: len(c)] = c
+
+        lookback = self.LOOKBACK_PERIOD
+        momentum = np.full_like(close, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            momentum[:, lookback:] = (
+                (close[:, lookback:] - close[:, :-lookback]) / close[:, :-lookback] * 100
+            )
+        valid = np.isfinite(momentum)
+
+        # 每根K线上按动量稳定降序排名(无效值排在最后), 与 sorted(reverse=True) 的并列顺序一致
+        order = np.argsort(np.where(valid, -momentum, np.inf), axis=0, kind="stable")
+        rank = np.empty_like(order)
+        rank[order, np.arange(width)] = np.arange(len(pairs))[:, None]
+
+        # 前N个有效币对做多, 后N个有效币对做空
+        k = min(self.TOP_N, len(pairs))
+        top = valid & (rank < k)
+        bottom = valid & (rank >= valid.sum(axis=0) - k)
+
+        return close, momentum, top, bottom
+
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """入场信号"""
         pair = metadata["pair"]
 
-        # 初始化信号列
-        dataframe["enter_long"] = 0
-        dataframe["enter_short"] = 0
+        # 初始化信号列, 使用int8以减少内存占用
+        dataframe["enter_long"] = np.zeros(len(dataframe), dtype=np.int8)
+        dataframe["enter_short"] = np.zeros(len(dataframe), dtype=np.int8)
 
         # 确保数据足够
         if len(dataframe) <= self.LOOKBACK_PERIOD:
             return dataframe
 
-        # 对每根K线计算动量排名
-        for i in range(self.LOOKBACK_PERIOD, len(dataframe)):
-            current_time = dataframe.index[i]
-
-            # 获取所有币对在这个时间点的动量数据
-            all_pairs_momentum = {}
-            for p in self.dp.current_whitelist():
-                pair_dataframe = self.dp.get_pair_dataframe(p, self.timeframe)
-                if len(pair_dataframe) > i:  # 确保这个币对在这个时间点有数据
-                    momentum = (
-                        (
-                            pair_dataframe["close"].iloc[i]
-                            - pair_dataframe["close"].iloc[i - self.LOOKBACK_PERIOD]
-                        )
-                        / pair_dataframe["close"].iloc[i - self.LOOKBACK_PERIOD]
-                        * 100
-                    )
-                    all_pairs_momentum[p] = momentum
-
-            if all_pairs_momentum:
-                # 按动量排序
-                sorted_pairs = sorted(all_pairs_momentum.items(), key=lambda x: x[1], reverse=True)
-                top_n = [p[0] for p in sorted_pairs[: self.TOP_N]]  # 最强的N个
-                bottom_n = [p[0] for p in sorted_pairs[-self.TOP_N :]]  # 最弱的N个
-
-                # 只在最后一根K线打印日志
-                if i == len(dataframe) - 1:
-                    logger.info(f"\n{'='*80}")
-                    logger.info(f"市场分析报告 - {current_time}")
-                    logger.info(
-                        f"\n回看周期: 过去{self.LOOKBACK_PERIOD}根{self.timeframe}K线 (约6小时)"
-                    )
-                    logger.info(f"\n当前监控的{len(sorted_pairs)}个交易对:")
-                    for p, m in sorted_pairs:
-                        price = self.dp.get_pair_dataframe(p, self.timeframe)["close"].iloc[i]
-                        logger.info(f"    {p}: {m:+.2f}% (价格: {price:.4f} USDT)")
-
-                    logger.info(f"\n最强势的{self.TOP_N}个币对(准备做多):")
-                    for p in top_n:
-                        m = all_pairs_momentum[p]
-                        price = self.dp.get_pair_dataframe(p, self.timeframe)["close"].iloc[i]
-                        logger.info(f"    {p}: +{m:.2f}% (价格: {price:.4f} USDT)")
-
-                    logger.info(f"\n最弱势的{self.TOP_N}个币对(准备做空):")
-                    for p in reversed(bottom_n):
-                        m = all_pairs_momentum[p]
-                        price = self.dp.get_pair_dataframe(p, self.timeframe)["close"].iloc[i]
-                        logger.info(f"    {p}: {m:.2f}% (价格: {price:.4f} USDT)")
-
-                # 设置交易信号
-                if pair in top_n:
-                    dataframe.loc[dataframe.index[i], "enter_long"] = 1
-                    if i == len(dataframe) - 1:  # 只在最后一根K线打印日志
-                        price = dataframe["close"].iloc[i]
-                        amount = self.wallets.get_total_stake_amount() * self.POSITION_SIZE
-                        logger.info(f"\n开仓信号 - 做多 {pair}")
-                        logger.info(f"开仓价格: {price:.4f} USDT")
-                        logger.info(
-                            f"开仓金额: {amount:.2f} USDT (账户总额的{self.POSITION_SIZE*100}%)"
-                        )
-                        logger.info(f"计划持仓: {self.HOLDING_PERIOD}天")
-
-                if pair in bottom_n:
-                    dataframe.loc[dataframe.index[i], "enter_short"] = 1
-                    if i == len(dataframe) - 1:  # 只在最后一根K线打印日志
-                        price = dataframe["close"].iloc[i]
-                        amount = self.wallets.get_total_stake_amount() * self.POSITION_SIZE
-                        logger.info(f"\n开仓信号 - 做空 {pair}")
-                        logger.info(f"开仓价格: {price:.4f} USDT")
-                        logger.info(
-                            f"开仓金额: {amount:.2f} USDT (账户总额的{self.POSITION_SIZE*100}%)"
-                        )
-                        logger.info(f"计划持仓: {self.HOLDING_PERIOD}天")
+        pairs = self.dp.current_whitelist()
+        if not pairs:
+            return dataframe
+
+        # 对每根K线计算动量排名, 同一批数据只计算一次
+        cache_key = (dataframe["date"].iat[-1], len(dataframe), tuple(pairs))
+        if cache_key not in self._mom_cache:
+            self._mom_cache = {cache_key: self._rank_momentum(pairs, len(dataframe))}
+        close, momentum, top, bottom = self._mom_cache[cache_key]
+
+        # 只在最后一根K线打印日志, 日志级别未开启时跳过排序与格式化
+        i = len(dataframe) - 1
+        log_enabled = logger.isEnabledFor(logging.INFO)
+        valid_rows = np.flatnonzero(np.isfinite(momentum[:, i]))
+        if log_enabled and len(valid_rows) > 0:
+            # 按动量排序
+            sorted_rows = valid_rows[np.argsort(-momentum[valid_rows, i], kind="stable")]
+            top_n = [r for r in sorted_rows if top[r, i]]  # 最强的N个
+            bottom_n = [r for r in sorted_rows if bottom[r, i]]  # 最弱的N个
+
+            logger.info("\n%s", "=" * 80)
+            logger.info("市场分析报告 - %s", dataframe.index[i])
+            logger.info("\n回看周期: 过去%s根%sK线 (约6小时)", self.LOOKBACK_PERIOD, self.timeframe)
+            logger.info("\n当前监控的%s个交易对:", len(sorted_rows))
+            for r in sorted_rows:
+                logger.info(
+                    "    %s: %+.2f%% (价格: %.4f USDT)", pairs[r], momentum[r, i], close[r, i]
+                )
+
+            logger.info("\n最强势的%s个币对(准备做多):", self.TOP_N)
+            for r in top_n:
+                logger.info(
+                    "    %s: +%.2f%% (价格: %.4f USDT)", pairs[r], momentum[r, i], close[r, i]
+                )
+
+            logger.info("\n最弱势的%s个币对(准备做空):", self.TOP_N)
+            for r in reversed(bottom_n):
+                logger.info(
+                    "    %s: %.2f%% (价格: %.4f USDT)", pairs[r], momentum[r, i], close[r, i]
+                )
+
+        if pair not in pairs:
+            return dataframe
+
+        # 设置交易信号
+        row = pairs.index(pair)
+        dataframe["enter_long"] = top[row, : len(dataframe)].astype(np.int8)
+        dataframe["enter_short"] = bottom[row, : len(dataframe)].astype(np.int8)
+
+        if log_enabled:
+            for side, mask in (("做多", top), ("做空", bottom)):
+                if not mask[row, i]:
+                    continue
+                amount = self.wallets.get_total_stake_amount() * self.POSITION_SIZE
+                logger.info("\n开仓信号 - %s %s", side, pair)
+                logger.info("开仓价格: %.4f USDT", dataframe["close"].iat[i])
+                logger.info(
+                    "开仓金额: %.2f USDT (账户总额的%s%%)", amount, self.POSITION_SIZE * 100
+                )
+                logger.info("计划持仓: %s天", self.HOLDING_PERIOD)
 
         return dataframe
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """出场信号 - 固定持仓时间后平仓"""
-        dataframe["exit_long"] = 0
-        dataframe["exit_short"] = 0
-
         # 计算持仓时间
         holding_periods = self.HOLDING_PERIOD * 24 * 60 // int(self.timeframe[:-1])  # 转换为K线数量
 
-        # 设置平仓信号
-        for i in range(len(dataframe)):
-            if i >= holding_periods:
-                if dataframe["enter_long"].iloc[i - holding_periods] == 1:
-                    dataframe.loc[dataframe.index[i], "exit_long"] = 1
-                if dataframe["enter_short"].iloc[i - holding_periods] == 1:
-                    dataframe.loc[dataframe.index[i], "exit_short"] = 1
+        # 设置平仓信号: 入场信号整体后移持仓K线数
+        for enter_col, exit_col in (("enter_long", "exit_long"), ("enter_short", "exit_short")):
+            exits = np.zeros(len(dataframe), dtype=np.int8)
+            enters = dataframe[enter_col].to_numpy()
+            exits[holding_periods:] = enters[: max(len(dataframe) - holding_periods, 0)] == 1
+            dataframe[exit_col] = exits
 
         return dataframe
 